@@ -8,6 +8,10 @@ import os
 import sys
 import socket
 
+# Starting size of the response buffer, and the kernel receive buffer requested for the socket
+RECV_CHUNK = 65536
+RECV_BUFFER_SIZE = 262144
+
 
 def parse_http_response(response_data):
     """Parse HTTP response into headers and body."""
@@ -49,12 +53,25 @@ def get_content_type(headers):
     return content_type.split(';')[0].strip()
 
 
+def get_response_length(response_data, header_end):
+    """Return the total response size announced by Content-Length, or None if absent."""
+    headers_raw = response_data[:header_end].decode('utf-8', errors='ignore')
+    for line in headers_raw.split('\r\n')[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            if key.strip().lower() == 'content-length':
+                return header_end + 4 + int(value.strip())
+    return None
+
+
 def make_request(host, port, path):
     """Make an HTTP GET request."""
     try:
         # Create socket
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.settimeout(10)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         # Connect to server
         client_socket.connect((host, port))
@@ -68,17 +85,34 @@ def make_request(host, port, path):
         # Send request
         client_socket.sendall(request.encode('utf-8'))
 
-        # Receive response
-        response_data = b''
-        while True:
-            chunk = client_socket.recv(4096)
-            if not chunk:
+        # Receive the response with recv_into() straight into one buffer. Once the
+        # headers give a Content-Length the buffer is sized to the whole response and
+        # reading stops there, so a keep-alive server that leaves the connection open
+        # does not stall us; without one the buffer doubles until the server closes.
+        buffer = bytearray(RECV_CHUNK)
+        received = 0
+        header_end = -1
+        expected = None
+        while expected is None or received < expected:
+            if received == len(buffer):
+                buffer.extend(bytes(len(buffer)))
+            n = client_socket.recv_into(memoryview(buffer)[received:])
+            if not n:
                 break
-            response_data += chunk
+            received += n
+
+            if header_end == -1:
+                # Earlier bytes were already searched, except the last 3
+                header_end = buffer.find(b'\r\n\r\n', max(0, received - n - 3), received)
+                if header_end != -1:
+                    expected = get_response_length(buffer, header_end)
+                    if expected is not None and expected > len(buffer):
+                        buffer.extend(bytes(expected - len(buffer)))
 
         client_socket.close()
 
-        return response_data
+        del buffer[received:]
+        return buffer
 
     except socket.timeout:
         print("Error: Connection timed out")
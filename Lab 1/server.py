@@ -5,115 +5,191 @@ Serves files from a specified directory with support for HTML, PNG, and PDF file
 Handles directory listings for nested directories.
 """
 
+import html
 import os
 import sys
+import stat
 import socket
-from pathlib import Path
+from collections import OrderedDict
 from urllib.parse import unquote
 
-
-def get_content_type(file_path):
-    """Determine the content type based on file extension."""
-    ext = Path(file_path).suffix.lower()
-    content_types = {
-        '.html': 'text/html',
-        '.htm': 'text/html',
-        '.png': 'image/png',
-        '.pdf': 'application/pdf'
-    }
-    return content_types.get(ext, 'application/octet-stream')
-
-
-def generate_directory_listing(dir_path, url_path):
-    """Generate HTML page for directory listing."""
-    html = f"""<!DOCTYPE html>
+# Size of each recv() call, and a buffer reused for every request
+RECV_CHUNK = 65536
+recv_buffer = bytearray(RECV_CHUNK)
+
+# Listen backlog and kernel send buffer size for accepted sockets
+LISTEN_BACKLOG = 128
+SEND_BUFFER_SIZE = 1 << 20
+
+# Content types of the files the server is willing to serve
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.htm': 'text/html',
+    '.png': 'image/png',
+    '.pdf': 'application/pdf'
+}
+SUPPORTED_EXTENSIONS = frozenset(CONTENT_TYPES)
+
+# Cache of generated directory listings: (dir_path, mtime_ns, url_path) -> page bytes
+DIR_CACHE_SIZE = 64
+dir_cache = OrderedDict()
+
+# Contents of small files kept in memory: file_path -> (mtime_ns, size, bytes).
+# Files above FILE_CACHE_MAX_FILE are always sent with sendfile() instead.
+FILE_CACHE_SIZE = 64 << 20
+FILE_CACHE_MAX_FILE = 1 << 20
+file_cache = OrderedDict()
+file_cache_bytes = 0
+
+# Static parts of the directory listing page
+LISTING_HEAD = b"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8">
-    <title>Directory listing for {url_path}</title>
+    <title>Directory listing for %s</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             margin: 40px;
             background-color: #f5f5f5;
-        }}
-        h1 {{
+        }
+        h1 {
             border-bottom: 2px solid #333;
             padding-bottom: 10px;
-        }}
-        ul {{
+        }
+        ul {
             list-style-type: none;
             padding: 0;
-        }}
-        li {{
+        }
+        li {
             padding: 8px;
             margin: 5px 0;
             background-color: white;
             border-radius: 4px;
-        }}
-        a {{
+        }
+        a {
             text-decoration: none;
             color: #0066cc;
-        }}
-        a:hover {{
+        }
+        a:hover {
             text-decoration: underline;
-        }}
-        .folder {{
+        }
+        .folder {
             font-weight: bold;
-        }}
+        }
     </style>
 </head>
 <body>
-    <h1>Directory listing for {url_path}</h1>
+    <h1>Directory listing for %s</h1>
     <hr>
     <ul>
 """
 
+LISTING_TAIL = b"""    </ul>
+    <hr>
+</body>
+</html>
+"""
+
+
+def generate_directory_listing(dir_path, url_path):
+    """Return the directory listing HTML, reusing it while the directory is unchanged."""
+    try:
+        mtime = os.stat(dir_path).st_mtime_ns
+    except OSError:
+        return build_directory_listing(dir_path, url_path)
+
+    key = (dir_path, mtime, url_path)
+    page = dir_cache.get(key)
+    if page is not None:
+        dir_cache.move_to_end(key)
+        return page
+
+    page = build_directory_listing(dir_path, url_path)
+    dir_cache[key] = page
+    if len(dir_cache) > DIR_CACHE_SIZE:
+        dir_cache.popitem(last=False)
+    return page
+
+
+def build_directory_listing(dir_path, url_path):
+    """Generate HTML page for directory listing."""
+    parts = []
+
     # Add parent directory link if not at root
     if url_path != '/':
         parent_path = '/'.join(url_path.rstrip('/').split('/')[:-1]) or '/'
-        html += f'        <li class="folder"><a href="{parent_path}">📂 Parent Directory</a></li>\n'
+        parts.append(f'        <li class="folder"><a href="{parent_path}">📂 Parent Directory</a></li>\n')
 
     try:
-        entries = sorted(os.listdir(dir_path))
+        # scandir reports the entry type without a separate stat() per entry
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda e: e.name)
 
         # Separate directories and files
         dirs = []
         files = []
 
         for entry in entries:
-            full_path = os.path.join(dir_path, entry)
-            if os.path.isdir(full_path):
-                dirs.append(entry)
+            if entry.is_dir():
+                dirs.append(entry.name)
             else:
-                files.append(entry)
+                files.append(entry.name)
 
         # List directories first
         for directory in dirs:
             link = f"{url_path.rstrip('/')}/{directory}/"
-            html += f'        <li class="folder"><a href="{link}">📂 {directory}/</a></li>\n'
+            parts.append(f'        <li class="folder"><a href="{link}">📂 {directory}/</a></li>\n')
 
         # Then list files
         for file in files:
             link = f"{url_path.rstrip('/')}/{file}"
-            html += f'        <li><a href="{link}">📜 {file}</a></li>\n'
+            parts.append(f'        <li><a href="{link}">📜 {file}</a></li>\n')
 
     except Exception as e:
-        html += f'        <li>Error reading directory: {str(e)}</li>\n'
+        parts.append(f'        <li>Error reading directory: {str(e)}</li>\n')
 
-    html += """    </ul>
-    <hr>
-</body>
-</html>
-"""
-    return html
+    url_bytes = html.escape(url_path).encode('utf-8')
+    return LISTING_HEAD % (url_bytes, url_bytes) + ''.join(parts).encode('utf-8') + LISTING_TAIL
+
+
+def read_cached(file_path, st):
+    """Return the contents of a small file from the cache, or None if it is too large."""
+    global file_cache_bytes
+
+    if st.st_size > FILE_CACHE_MAX_FILE:
+        return None
+
+    entry = file_cache.get(file_path)
+    if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        file_cache.move_to_end(file_path)
+        return entry[2]
+
+    with open(file_path, 'rb') as f:
+        content = f.read()
+
+    if entry is not None:
+        del file_cache[file_path]
+        file_cache_bytes -= len(entry[2])
+    file_cache[file_path] = (st.st_mtime_ns, st.st_size, content)
+    file_cache_bytes += len(content)
+    while file_cache_bytes > FILE_CACHE_SIZE:
+        _, (_, _, evicted) = file_cache.popitem(last=False)
+        file_cache_bytes -= len(evicted)
+    return content
+
+
+def is_inside(base_dir, path):
+    """Check that a normalized absolute path lies within base_dir."""
+    return path == base_dir or path.startswith(os.path.join(base_dir, ''))
 
 
 def handle_request(client_socket, base_dir):
     """Handle a single HTTP request."""
     try:
         # Receive the request
-        request = client_socket.recv(4096).decode('utf-8')
+        n = client_socket.recv_into(recv_buffer)
+        request = recv_buffer[:n].decode('utf-8')
 
         if not request:
             return
@@ -124,7 +200,7 @@ def handle_request(client_socket, base_dir):
         parts = request_line.split()
 
         if len(parts) < 2:
-            send_response(client_socket, 400, 'text/plain', b'Bad Request')
+            send_prebuilt(client_socket, RESPONSE_400)
             return
 
         method = parts[0]
@@ -133,7 +209,7 @@ def handle_request(client_socket, base_dir):
         print(f"Request: {method} {url_path}")
 
         if method != 'GET':
-            send_response(client_socket, 405, 'text/plain', b'Method Not Allowed')
+            send_prebuilt(client_socket, RESPONSE_405)
             return
 
         # Handle root path
@@ -142,8 +218,8 @@ def handle_request(client_socket, base_dir):
             # If index.html doesn't exist, show directory listing
             index_path = os.path.join(base_dir, 'index.html')
             if not os.path.exists(index_path):
-                html = generate_directory_listing(base_dir, '/')
-                send_response(client_socket, 200, 'text/html', html.encode('utf-8'))
+                body = generate_directory_listing(base_dir, '/')
+                send_response(client_socket, 200, 'text/html', body)
                 return
 
         # Remove leading slash and construct file path
@@ -151,42 +227,35 @@ def handle_request(client_socket, base_dir):
         file_path = os.path.join(base_dir, relative_path)
 
         # Normalize path to prevent directory traversal attacks
+        # (base_dir is already absolute, see main())
         file_path = os.path.normpath(file_path)
-        base_dir_abs = os.path.abspath(base_dir)
-        file_path_abs = os.path.abspath(file_path)
 
-        if not file_path_abs.startswith(base_dir_abs):
-            send_response(client_socket, 403, 'text/plain', b'Forbidden')
+        if not is_inside(base_dir, file_path):
+            send_prebuilt(client_socket, RESPONSE_403)
             return
 
-        # Check if path exists
-        if not os.path.exists(file_path):
-            send_response(client_socket, 404, 'text/html',
-                          b'<html><body><h1>404 Not Found</h1><p>The requested file was not found.</p></body></html>')
+        # Check if path exists (one stat() call answers both exists and isdir)
+        try:
+            st = os.stat(file_path)
+        except (OSError, ValueError):  # ValueError: embedded NUL byte in the path
+            send_prebuilt(client_socket, RESPONSE_404)
             return
 
         # If it's a directory, generate listing
-        if os.path.isdir(file_path):
-            html = generate_directory_listing(file_path, url_path)
-            send_response(client_socket, 200, 'text/html', html.encode('utf-8'))
+        if stat.S_ISDIR(st.st_mode):
+            body = generate_directory_listing(file_path, url_path)
+            send_response(client_socket, 200, 'text/html', body)
             return
 
         # NEW: Check if file extension is supported
-        ext = Path(file_path).suffix.lower()
-        supported_extensions = ['.html', '.htm', '.png', '.pdf']
+        ext = os.path.splitext(file_path)[1].lower()
 
-        if ext not in supported_extensions:
-            send_response(client_socket, 404, 'text/html',
-                          b'<html><body><h1>404 Not Found</h1><p>File type not supported. Server only supports HTML, PNG, and PDF files.</p></body></html>')
+        if ext not in SUPPORTED_EXTENSIONS:
+            send_prebuilt(client_socket, RESPONSE_404_TYPE)
             return
 
-        # Read and send the file
-        content_type = get_content_type(file_path)
-
-        with open(file_path, 'rb') as f:
-            content = f.read()
-
-        send_response(client_socket, 200, content_type, content)
+        # Send the file
+        send_file(client_socket, file_path, CONTENT_TYPES[ext], st)
 
     except Exception as e:
         print(f"Error handling request: {e}")
@@ -197,27 +266,94 @@ def handle_request(client_socket, base_dir):
             pass
 
 
-def send_response(client_socket, status_code, content_type, body):
-    """Send an HTTP response."""
-    status_messages = {
-        200: 'OK',
-        400: 'Bad Request',
-        403: 'Forbidden',
-        404: 'Not Found',
-        405: 'Method Not Allowed',
-        500: 'Internal Server Error'
-    }
+# Status lines and Content-Type headers, encoded once at import time
+STATUS_LINES = {
+    200: b'HTTP/1.1 200 OK\r\n',
+    400: b'HTTP/1.1 400 Bad Request\r\n',
+    403: b'HTTP/1.1 403 Forbidden\r\n',
+    404: b'HTTP/1.1 404 Not Found\r\n',
+    405: b'HTTP/1.1 405 Method Not Allowed\r\n',
+    500: b'HTTP/1.1 500 Internal Server Error\r\n'
+}
+CONTENT_TYPE_HEADERS = {
+    content_type: b'Content-Type: %s\r\n' % content_type.encode('ascii')
+    for content_type in ('text/html', 'text/plain', *CONTENT_TYPES.values())
+}
+
+
+def build_headers(status_code, content_type, content_length):
+    """Build the status line and headers of an HTTP response."""
+    status_line = STATUS_LINES.get(status_code)
+    if status_line is None:
+        status_line = b'HTTP/1.1 %d Unknown\r\n' % status_code
+    content_type_header = CONTENT_TYPE_HEADERS.get(content_type)
+    if content_type_header is None:
+        content_type_header = b'Content-Type: %s\r\n' % content_type.encode('ascii')
+
+    return (status_line + content_type_header
+            + b'Content-Length: %d\r\nConnection: close\r\n\r\n' % content_length)
 
-    status_message = status_messages.get(status_code, 'Unknown')
 
-    response = f"HTTP/1.1 {status_code} {status_message}\r\n"
-    response += f"Content-Type: {content_type}\r\n"
-    response += f"Content-Length: {len(body)}\r\n"
-    response += "Connection: close\r\n"
-    response += "\r\n"
+def send_headers(client_socket, status_code, content_type, content_length):
+    """Send the status line and headers of an HTTP response."""
+    client_socket.sendall(build_headers(status_code, content_type, content_length))
+
+
+def prebuild_response(status_code, content_type, body):
+    """Format and encode a complete response once, for static error pages."""
+    return build_headers(status_code, content_type, len(body)) + body
+
+
+# Complete error responses, built once at startup
+RESPONSE_400 = prebuild_response(400, 'text/plain', b'Bad Request')
+RESPONSE_403 = prebuild_response(403, 'text/plain', b'Forbidden')
+RESPONSE_404 = prebuild_response(
+    404, 'text/html',
+    b'<html><body><h1>404 Not Found</h1><p>The requested file was not found.</p></body></html>')
+RESPONSE_404_TYPE = prebuild_response(
+    404, 'text/html',
+    b'<html><body><h1>404 Not Found</h1><p>File type not supported. Server only supports HTML, PNG, and PDF files.</p></body></html>')
+RESPONSE_405 = prebuild_response(405, 'text/plain', b'Method Not Allowed')
+
+
+def send_prebuilt(client_socket, response):
+    """Send one of the prebuilt RESPONSE_* byte strings."""
+    client_socket.sendall(response)
+
+
+def send_response(client_socket, status_code, content_type, body):
+    """Send an HTTP response with an in-memory body."""
+    header_bytes = build_headers(status_code, content_type, len(body))
+
+    # Send headers and body with one sendmsg() call instead of two sendall() calls
+    try:
+        sent = client_socket.sendmsg([header_bytes, body])
+    except AttributeError:
+        # sendmsg() is not available on every platform
+        client_socket.sendall(header_bytes + body)
+        return
+
+    # Finish a partial write
+    if sent < len(header_bytes):
+        client_socket.sendall(header_bytes[sent:])
+        client_socket.sendall(body)
+    elif sent < len(header_bytes) + len(body):
+        client_socket.sendall(memoryview(body)[sent - len(header_bytes):])
+
+
+def send_file(client_socket, file_path, content_type, st):
+    """Send a file as a 200 response, from the file cache or with sendfile()."""
+    content = read_cached(file_path, st)
+    if content is not None:
+        send_response(client_socket, 200, content_type, content)
+        return
 
-    client_socket.sendall(response.encode('utf-8'))
-    client_socket.sendall(body)
+    with open(file_path, 'rb') as f:
+        # The file may have changed since the stat(), so take the length from the open file
+        content_length = os.fstat(f.fileno()).st_size
+        send_headers(client_socket, 200, content_type, content_length)
+        # socket.sendfile() falls back to read()/send() by itself if sendfile(2) is unusable
+        client_socket.sendfile(f, count=content_length)
 
 
 def main():
@@ -225,7 +361,8 @@ def main():
         print("Usage: python server.py <directory>")
         sys.exit(1)
 
-    base_dir = sys.argv[1]
+    # Resolve once here so requests don't have to
+    base_dir = os.path.abspath(sys.argv[1])
 
     if not os.path.isdir(base_dir):
         print(f"Error: {base_dir} is not a directory")
@@ -240,15 +377,17 @@ def main():
 
     try:
         server_socket.bind((host, port))
-        server_socket.listen(5)
+        server_socket.listen(LISTEN_BACKLOG)
 
         print(f"Server listening on {host}:{port}")
-        print(f"Serving directory: {os.path.abspath(base_dir)}")
+        print(f"Serving directory: {base_dir}")
         print("Press Ctrl+C to stop")
 
         while True:
             client_socket, client_address = server_socket.accept()
             print(f"\nConnection from {client_address}")
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
 
             handle_request(client_socket, base_dir)
             client_socket.close()
@@ -6,24 +6,65 @@ Unified HTTP File Server with multiple modes:
 - race: multithreaded with naive counter (race condition)
 - threadsafe: multithreaded with thread-safe counter (lock)
 - ratelimit: threadsafe counter + IP rate limiting (limit ~5 req/s)
+- uring: single-threaded io_uring event loop, no counter (Linux, needs `pip install liburing`)
+- async: single-threaded asyncio event loop with hit counter, files sent with sendfile
 
 Change SERVER_MODE below to switch mode.
 """
 
+import asyncio
+import html
 import os
 import sys
+import stat
 import socket
+import queue
+import selectors
 import threading
 import time
-from pathlib import Path
 from urllib.parse import unquote
-from collections import defaultdict
-from datetime import datetime
+from collections import defaultdict, deque, OrderedDict
+
+try:
+    import liburing  # only needed for the "uring" mode
+except ImportError:
+    liburing = None
 
 # === CONFIGURE SERVER MODE HERE ===
-# Change this to: "single", "multi", "race", "threadsafe", "ratelimit"
+# Change this to: "single", "multi", "race", "threadsafe", "ratelimit", "uring", "async"
 SERVER_MODE = "ratelimit"
 
+# Size of each recv() call
+RECV_CHUNK = 65536
+
+# Receive buffers kept for reuse, at most this many
+BUFFER_POOL_SIZE = 64
+
+# Listen backlog and kernel send buffer size for accepted sockets
+LISTEN_BACKLOG = 128
+SEND_BUFFER_SIZE = 1 << 20
+
+# Worker threads that handle connections in the multithreaded modes, and how
+# many more connections may be open (waiting for a free worker or idle between
+# keep-alive requests) before new ones are turned away with 503
+MAX_WORKERS = 64
+MAX_QUEUED_CONNECTIONS = 256
+
+# Threads accepting connections in the multithreaded modes, each on its own
+# SO_REUSEPORT listening socket
+ACCEPT_THREADS = min(4, os.cpu_count() or 1)
+
+# Idle connections are closed after this many seconds (keep-alive)
+KEEP_ALIVE_TIMEOUT = 15
+MAX_HEADER_SIZE = 65536
+
+# Largest request body the server will read and discard; requests announcing
+# more are answered with 400
+MAX_BODY_SIZE = 1 << 20
+
+# Submission queue size for the io_uring event loop (uring mode)
+URING_ENTRIES = 256
+
 # === Globals Used by All Modes ===
 
 # For counter modes
@@ -32,46 +73,95 @@ counter_lock = threading.Lock()
 
 # For rate limiting (ratelimit mode)
 rate_limit_lock = threading.Lock()
-rate_limits = defaultdict(list)  # {ip: [timestamp, ...]}
+rate_limits = defaultdict(deque)  # {ip: deque([timestamp, ...])}, oldest first
 
+# Content types of the files the server is willing to serve
+CONTENT_TYPES = {
+    '.html': 'text/html',
+    '.htm': 'text/html',
+    '.png': 'image/png',
+    '.pdf': 'application/pdf'
+}
+SUPPORTED_EXTENSIONS = frozenset(CONTENT_TYPES)
 
-def get_content_type(file_path):
-    ext = Path(file_path).suffix.lower()
-    content_types = {
-        '.html': 'text/html',
-        '.htm': 'text/html',
-        '.png': 'image/png',
-        '.pdf': 'application/pdf'
-    }
-    return content_types.get(ext, 'application/octet-stream')
+# Cache of generated directory listings (modes without hit counters only)
+DIR_CACHE_SIZE = 64
+dir_cache = OrderedDict()  # {(dir_path, mtime_ns, url_path): page bytes}
+dir_cache_lock = threading.Lock()
 
+# Contents of small files kept in memory, files above FILE_CACHE_MAX_FILE use sendfile()
+FILE_CACHE_SIZE = 64 << 20
+FILE_CACHE_MAX_FILE = 1 << 20
+file_cache = OrderedDict()  # {file_path: (mtime_ns, size, content)}
+file_cache_bytes = 0
+file_cache_lock = threading.Lock()
 
-def generate_directory_listing(dir_path, url_path):
-    html = f"""<!DOCTYPE html>
+# Static parts of the directory listing page
+LISTING_HEAD = b"""<!DOCTYPE html>
 <html>
 <head>
-<title>Directory listing for {url_path}</title>
+<title>Directory listing for %s</title>
 <style>
-body {{ font-family: Arial, sans-serif; margin: 20px; }}
-h1 {{ border-bottom: 1px solid #ccc; }}
-table {{ border-collapse: collapse; width: 100%; }}
-th, td {{ text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }}
-th {{ background-color: #f2f2f2; }}
-a {{ text-decoration: none; color: #0066cc; }}
-a:hover {{ text-decoration: underline; }}
+body { font-family: Arial, sans-serif; margin: 20px; }
+h1 { border-bottom: 1px solid #ccc; }
+table { border-collapse: collapse; width: 100%%; }
+th, td { text-align: left; padding: 8px; border-bottom: 1px solid #ddd; }
+th { background-color: #f2f2f2; }
+a { text-decoration: none; color: #0066cc; }
+a:hover { text-decoration: underline; }
 </style>
 </head>
 <body>
-<h1>Directory listing for {url_path}</h1>
+<h1>Directory listing for %s</h1>
 <table>
 <tr><th>File / Directory</th><th>Hits</th></tr>
 """
+LISTING_TAIL = b"</table></body></html>"
+
+
+def generate_directory_listing(dir_path, url_path):
+    # Hit counts change on every request, so only cache when they are not shown
+    if SERVER_MODE in ["race", "threadsafe", "ratelimit", "async"]:
+        return build_directory_listing(dir_path, url_path)
 
     try:
-        items = sorted(os.listdir(dir_path))
-        for item in items:
-            fpath = os.path.join(dir_path, item)
-            if os.path.isdir(fpath):
+        mtime = os.stat(dir_path).st_mtime_ns
+    except OSError:
+        return build_directory_listing(dir_path, url_path)
+
+    key = (dir_path, mtime, url_path)
+    with dir_cache_lock:
+        page = dir_cache.get(key)
+        if page is not None:
+            dir_cache.move_to_end(key)
+            return page
+
+    page = build_directory_listing(dir_path, url_path)
+    with dir_cache_lock:
+        dir_cache[key] = page
+        if len(dir_cache) > DIR_CACHE_SIZE:
+            dir_cache.popitem(last=False)
+    return page
+
+
+def build_directory_listing(dir_path, url_path):
+    parts = []
+
+    try:
+        # scandir reports the entry type without a separate stat() per entry
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+
+        # Show hits only in applicable modes, all read under one lock acquisition
+        if SERVER_MODE in ["race", "threadsafe", "ratelimit", "async"]:
+            with counter_lock:
+                hit_counts = [file_hits.get(entry.path, 0) for entry in entries]
+        else:
+            hit_counts = [''] * len(entries)
+
+        for entry, hits in zip(entries, hit_counts):
+            item = entry.name
+            if entry.is_dir():
                 display_name = item + '/'
             else:
                 display_name = item
@@ -81,154 +171,188 @@ a:hover {{ text-decoration: underline; }}
             else:
                 item_url = url_path + '/' + item
 
-            # Show hits only in applicable modes
-            hits = ''
-            if SERVER_MODE in ["race", "threadsafe", "ratelimit"]:
-                with counter_lock:
-                    hits = file_hits.get(fpath, 0)
-
-            html += f'<tr><td><a href="{item_url}">{display_name}</a></td><td>{hits}</td></tr>\n'
+            parts.append(f'<tr><td><a href="{item_url}">{display_name}</a></td><td>{hits}</td></tr>\n')
     except Exception as e:
-        html += f'<tr><td colspan="2">Error reading directory: {str(e)}</td></tr>\n'
+        parts.append(f'<tr><td colspan="2">Error reading directory: {str(e)}</td></tr>\n')
+
+    url_bytes = html.escape(url_path).encode("utf-8")
+    return LISTING_HEAD % (url_bytes, url_bytes) + ''.join(parts).encode("utf-8") + LISTING_TAIL
+
 
-    html += "</table></body></html>"
+def read_cached(file_path, st):
+    # Contents of a small file, reread only when its mtime or size changes.
+    # Returns None for files too large to cache.
+    global file_cache_bytes
 
-    return html
+    if st.st_size > FILE_CACHE_MAX_FILE:
+        return None
+
+    with file_cache_lock:
+        entry = file_cache.get(file_path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            file_cache.move_to_end(file_path)
+            return entry[2]
+
+    with open(file_path, "rb") as f:
+        content = f.read()
+
+    with file_cache_lock:
+        old = file_cache.pop(file_path, None)
+        if old is not None:
+            file_cache_bytes -= len(old[2])
+        file_cache[file_path] = (st.st_mtime_ns, st.st_size, content)
+        file_cache_bytes += len(content)
+        while file_cache_bytes > FILE_CACHE_SIZE:
+            _, (_, _, evicted) = file_cache.popitem(last=False)
+            file_cache_bytes -= len(evicted)
+    return content
 
 
 def rate_limited(ip_addr):
-    # Clean timestamps older than 1s
-    now = datetime.now().timestamp()
+    # Sliding 1s window: drop expired timestamps from the front of the deque
+    now = time.monotonic()
     with rate_limit_lock:
         timestamps = rate_limits[ip_addr]
-        rate_limits[ip_addr] = [ts for ts in timestamps if now - ts < 1]
+        while timestamps and now - timestamps[0] >= 1:
+            timestamps.popleft()
 
-        if len(rate_limits[ip_addr]) >= 5:
+        if len(timestamps) >= 5:
             return True
 
-        rate_limits[ip_addr].append(now)
+        timestamps.append(now)
         return False
 
 
-def handle_client(client_socket, client_address, base_dir):
-    thread_name = threading.current_thread().name
-    print(f"[{thread_name}] {client_address} connected")
+class BufferPool:
+    # Reusable bytearray(size) buffers for recv_into(), shared by all threads.
+    # get() hands out a pooled buffer or a new one; put() keeps up to cap of them.
 
-    try:
-        request = client_socket.recv(4096).decode("utf-8", errors="ignore")
-        if not request:
-            return
-
-        lines = request.split("\r\n")
-        if not lines:
-            send_response(client_socket, 400, "text/plain", b"Bad Request")
-            return
-
-        request_line = lines[0].split()
-        if len(request_line) < 2:
-            send_response(client_socket, 400, "text/plain", b"Bad Request")
-            return
-
-        method, url_path = request_line[0], unquote(request_line[1])
-
-        # Rate limit check before any processing (ratelimit mode only)
-        if SERVER_MODE == "ratelimit":
-            ip = client_address[0]
-            if rate_limited(ip):
-                send_response(client_socket, 429, "text/plain", b"Too Many Requests")
-                print(f"[{thread_name}] 429 Too Many Requests from {ip}")
-                return
+    def __init__(self, size=RECV_CHUNK, cap=BUFFER_POOL_SIZE):
+        self.size = size
+        self._buffers = queue.LifoQueue(maxsize=cap)
 
-        if method != "GET":
-            send_response(client_socket, 405, "text/plain", b"Method Not Allowed")
-            return
+    def get(self):
+        try:
+            return self._buffers.get_nowait()
+        except queue.Empty:
+            return bytearray(self.size)
 
-        if url_path == "/":
-            file_path = base_dir
-        else:
-            relative_path = url_path.lstrip("/")
-            file_path = os.path.join(base_dir, relative_path)
+    def put(self, buf):
+        try:
+            self._buffers.put_nowait(buf)
+        except queue.Full:
+            pass
 
-        file_path = os.path.normpath(file_path)
-        base_dir_abs = os.path.abspath(base_dir)
-        file_path_abs = os.path.abspath(file_path)
 
-        if not file_path_abs.startswith(base_dir_abs):
-            send_response(client_socket, 403, "text/html", b"<!DOCTYPE html><html><body><h1>403 Forbidden</h1><p>Access denied.</p></body></html>")
-            return
+buffer_pool = BufferPool()
 
-        if not os.path.exists(file_path):
-            send_response(client_socket, 404, "text/html", b"<!DOCTYPE html><html><body><h1>404 Not Found</h1><p>File not found.</p></body></html>")
-            return
 
-        # Single-threaded mode process one request at a time with delay
-        if SERVER_MODE == "single":
-            time.sleep(1)
+def recv_more(client_socket, recv_view, buffer):
+    # Receive into recv_view and append the new bytes to buffer. Returns False on EOF.
+    n = client_socket.recv_into(recv_view)
+    if not n:
+        return False
+    buffer += recv_view[:n]
+    return True
 
-            # No concurrency, no counters or rate limits
-            if os.path.isdir(file_path):
-                html = generate_directory_listing(file_path, url_path)
-                send_response(client_socket, 200, "text/html", html.encode("utf-8"))
-                return
 
-            ext = Path(file_path).suffix.lower()
-            if ext not in [".html", ".htm", ".png", ".pdf"]:
-                send_response(client_socket, 404, "text/html", b"File type not supported")
-                return
+def is_inside(base_dir, path):
+    # Also rejects siblings such as /srv/www-evil for base_dir /srv/www
+    return path == base_dir or path.startswith(os.path.join(base_dir, ""))
 
-            content_type = get_content_type(file_path)
-            with open(file_path, "rb") as f:
-                content = f.read()
-            send_response(client_socket, 200, content_type, content)
-            return
 
-        # Multithreaded without counter (multi mode)
-        if SERVER_MODE == "multi":
-            time.sleep(1)  # simulate work
+def parse_request_head(head):
+    # Split the raw request head into its lines and a {lowercase name: value} header dict
+    lines = head.decode("utf-8", errors="ignore").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return lines, headers
 
-            if os.path.isdir(file_path):
-                html = generate_directory_listing(file_path, url_path)
-                send_response(client_socket, 200, "text/html", html.encode("utf-8"))
-                return
 
-            ext = Path(file_path).suffix.lower()
-            if ext not in [".html", ".htm", ".png", ".pdf"]:
-                send_response(client_socket, 404, "text/html", b"File type not supported")
-                return
+def parse_content_length(headers):
+    # Body length announced by the request, or None if the header is not a plain
+    # decimal number (this also rejects negative values) or exceeds MAX_BODY_SIZE
+    value = headers.get("content-length", "0")
+    if not (value.isascii() and value.isdigit()):
+        return None
+    body_length = int(value)
+    return body_length if body_length <= MAX_BODY_SIZE else None
 
-            content_type = get_content_type(file_path)
-            with open(file_path, "rb") as f:
-                content = f.read()
-            send_response(client_socket, 200, content_type, content)
-            return
 
-        # Race condition counter (naive)
-        if SERVER_MODE == "race":
-            current_count = file_hits.get(file_path, 0)
-            time.sleep(0.001)
-            file_hits[file_path] = current_count + 1
+def read_request(client_socket, recv_view, buffer):
+    # Read the next request from the connection. Bytes received past the end of
+    # this request stay in buffer for the next call. Returns None once the client
+    # has closed the connection or the request was answered with 400.
+    scan_from = 0  # bytes before this were already searched for the end of the headers
+    while True:
+        header_end = buffer.find(b"\r\n\r\n", scan_from)
+        if header_end != -1 or len(buffer) > MAX_HEADER_SIZE:
+            break
+        scan_from = max(0, len(buffer) - 3)
+        if not recv_more(client_socket, recv_view, buffer):
+            return None
 
-        # Thread-safe counter
-        if SERVER_MODE == "threadsafe" or SERVER_MODE == "ratelimit":
-            with counter_lock:
-                current_count = file_hits.get(file_path, 0)
-                time.sleep(0.001)
-                file_hits[file_path] = current_count + 1
+    # Headers over MAX_HEADER_SIZE, also when their end arrived in the same recv()
+    if header_end == -1 or header_end > MAX_HEADER_SIZE:
+        send_prebuilt(client_socket, RESPONSE_400[False])
+        return None
 
-        if os.path.isdir(file_path):
-            html = generate_directory_listing(file_path, url_path)
-            send_response(client_socket, 200, "text/html", html.encode("utf-8"))
-            return
+    lines, headers = parse_request_head(buffer[:header_end])
+    del buffer[:header_end + 4]
 
-        ext = Path(file_path).suffix.lower()
-        if ext not in [".html", ".htm", ".png", ".pdf"]:
-            send_response(client_socket, 404, "text/html", b"File type not supported")
-            return
+    body_length = parse_content_length(headers)
+    if body_length is None:
+        send_prebuilt(client_socket, RESPONSE_400[False])
+        return None
 
-        content_type = get_content_type(file_path)
-        with open(file_path, "rb") as f:
-            content = f.read()
-        send_response(client_socket, 200, content_type, content)
+    # GET requests normally have no body, but skip one if it was sent. The rest
+    # is received into recv_view and dropped, never more than the body itself,
+    # so a pipelined request after it stays on the socket.
+    skipped = min(len(buffer), body_length)
+    del buffer[:skipped]
+    body_length -= skipped
+    while body_length:
+        n = client_socket.recv_into(recv_view, min(body_length, len(recv_view)))
+        if not n:
+            return None
+        body_length -= n
+
+    return lines, headers
+
+
+def wants_keep_alive(request_line, headers):
+    # HTTP/1.1 keeps the connection open unless told otherwise, HTTP/1.0 only on request
+    connection = headers.get("connection", "").lower()
+    if len(request_line) > 2 and request_line[2] == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def handle_client(client_socket, client_address, base_dir, keep_alive=True):
+    thread_name = threading.current_thread().name
+    print(f"[{thread_name}] {client_address} connected")
+
+    recv_buf = buffer_pool.get()
+    try:
+        # Serve requests until the client closes the connection, sends
+        # "Connection: close" or stays idle for KEEP_ALIVE_TIMEOUT seconds
+        client_socket.settimeout(KEEP_ALIVE_TIMEOUT)
+        recv_view = memoryview(recv_buf)
+        buffer = bytearray()
+        while True:
+            try:
+                request = read_request(client_socket, recv_view, buffer)
+            except socket.timeout:
+                break
+            if request is None:
+                break
+
+            lines, headers = request
+            if not handle_request(client_socket, client_address, base_dir, lines, headers, keep_alive):
+                break
 
     except Exception as e:
         print(f"[{thread_name}] Error: {e}")
@@ -237,28 +361,215 @@ def handle_client(client_socket, client_address, base_dir):
         except:
             pass
     finally:
+        buffer_pool.put(recv_buf)
         client_socket.close()
         print(f"[{thread_name}] Connection closed")
 
 
-def send_response(client_socket, status_code, content_type, body):
-    messages = {
-        200: "OK",
-        400: "Bad Request",
-        403: "Forbidden",
-        404: "Not Found",
-        405: "Method Not Allowed",
-        429: "Too Many Requests",
-        500: "Internal Server Error",
+def handle_request(client_socket, client_address, base_dir, lines, headers, keep_alive):
+    # Handle one request. Returns True if the connection should stay open.
+    thread_name = threading.current_thread().name
+
+    request_line = lines[0].split()
+    if len(request_line) < 2:
+        send_prebuilt(client_socket, RESPONSE_400[False])
+        return False
+
+    keep_alive = keep_alive and wants_keep_alive(request_line, headers)
+    method, url_path = request_line[0], unquote(request_line[1])
+
+    # Rate limit check before any processing (ratelimit mode only)
+    if SERVER_MODE == "ratelimit":
+        ip = client_address[0]
+        if rate_limited(ip):
+            send_prebuilt(client_socket, RESPONSE_429[keep_alive])
+            print(f"[{thread_name}] 429 Too Many Requests from {ip}")
+            return keep_alive
+
+    if method != "GET":
+        send_prebuilt(client_socket, RESPONSE_405[keep_alive])
+        return keep_alive
+
+    if url_path == "/":
+        file_path = base_dir
+    else:
+        relative_path = url_path.lstrip("/")
+        file_path = os.path.join(base_dir, relative_path)
+
+    # base_dir is already absolute (see main()), so normpath is enough
+    file_path = os.path.normpath(file_path)
+
+    if not is_inside(base_dir, file_path):
+        send_prebuilt(client_socket, RESPONSE_403[keep_alive])
+        return keep_alive
+
+    # One stat() call answers both "does it exist" and "is it a directory"
+    try:
+        st = os.stat(file_path)
+    except (OSError, ValueError):  # ValueError: embedded NUL byte in the path
+        send_prebuilt(client_socket, RESPONSE_404[keep_alive])
+        return keep_alive
+
+    # Single-threaded mode process one request at a time with delay
+    if SERVER_MODE == "single":
+        time.sleep(1)
+
+        # No concurrency, no counters or rate limits
+        if stat.S_ISDIR(st.st_mode):
+            body = generate_directory_listing(file_path, url_path)
+            send_response(client_socket, 200, "text/html", body, keep_alive)
+            return keep_alive
+
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            send_prebuilt(client_socket, RESPONSE_404_TYPE[keep_alive])
+            return keep_alive
+
+        send_file(client_socket, file_path, CONTENT_TYPES[ext], st, keep_alive)
+        return keep_alive
+
+    # Multithreaded without counter (multi mode)
+    if SERVER_MODE == "multi":
+        time.sleep(1)  # simulate work
+
+        if stat.S_ISDIR(st.st_mode):
+            body = generate_directory_listing(file_path, url_path)
+            send_response(client_socket, 200, "text/html", body, keep_alive)
+            return keep_alive
+
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            send_prebuilt(client_socket, RESPONSE_404_TYPE[keep_alive])
+            return keep_alive
+
+        send_file(client_socket, file_path, CONTENT_TYPES[ext], st, keep_alive)
+        return keep_alive
+
+    # Race condition counter (naive). The sleep widens the read-modify-write
+    # window on purpose so the lost updates are easy to reproduce.
+    if SERVER_MODE == "race":
+        current_count = file_hits.get(file_path, 0)
+        time.sleep(0.001)
+        file_hits[file_path] = current_count + 1
+
+    # Thread-safe counter, the lock is only held for the increment itself
+    if SERVER_MODE == "threadsafe" or SERVER_MODE == "ratelimit":
+        with counter_lock:
+            file_hits[file_path] += 1
+
+    if stat.S_ISDIR(st.st_mode):
+        body = generate_directory_listing(file_path, url_path)
+        send_response(client_socket, 200, "text/html", body, keep_alive)
+        return keep_alive
+
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        send_prebuilt(client_socket, RESPONSE_404_TYPE[keep_alive])
+        return keep_alive
+
+    send_file(client_socket, file_path, CONTENT_TYPES[ext], st, keep_alive)
+    return keep_alive
+
+
+# Status lines, Content-Type and Connection headers, encoded once at import time
+STATUS_LINES = {
+    200: b"HTTP/1.1 200 OK\r\n",
+    400: b"HTTP/1.1 400 Bad Request\r\n",
+    403: b"HTTP/1.1 403 Forbidden\r\n",
+    404: b"HTTP/1.1 404 Not Found\r\n",
+    405: b"HTTP/1.1 405 Method Not Allowed\r\n",
+    429: b"HTTP/1.1 429 Too Many Requests\r\n",
+    500: b"HTTP/1.1 500 Internal Server Error\r\n",
+    503: b"HTTP/1.1 503 Service Unavailable\r\n",
+}
+CONTENT_TYPE_HEADERS = {
+    content_type: b"Content-Type: %s\r\n" % content_type.encode("ascii")
+    for content_type in ("text/html", "text/plain", *CONTENT_TYPES.values())
+}
+CONNECTION_HEADERS = {
+    False: b"Connection: close\r\n\r\n",
+    True: b"Connection: keep-alive\r\nKeep-Alive: timeout=%d\r\n\r\n" % KEEP_ALIVE_TIMEOUT,
+}
+
+
+def build_headers(status_code, content_type, content_length, keep_alive=False):
+    status_line = STATUS_LINES.get(status_code)
+    if status_line is None:
+        status_line = b"HTTP/1.1 %d Unknown\r\n" % status_code
+    content_type_header = CONTENT_TYPE_HEADERS.get(content_type)
+    if content_type_header is None:
+        content_type_header = b"Content-Type: %s\r\n" % content_type.encode("ascii")
+    return (status_line + content_type_header
+            + b"Content-Length: %d\r\n" % content_length
+            + CONNECTION_HEADERS[keep_alive])
+
+
+def send_headers(client_socket, status_code, content_type, content_length, keep_alive=False):
+    client_socket.sendall(build_headers(status_code, content_type, content_length, keep_alive))
+
+
+def prebuild_response(status_code, content_type, body):
+    # Format and encode a static response once, in both Connection variants
+    return {
+        keep_alive: build_headers(status_code, content_type, len(body), keep_alive) + body
+        for keep_alive in (False, True)
     }
-    status_message = messages.get(status_code, "Unknown")
-    response = f"HTTP/1.1 {status_code} {status_message}\r\n"
-    response += f"Content-Type: {content_type}\r\n"
-    response += f"Content-Length: {len(body)}\r\n"
-    response += "Connection: close\r\n"
-    response += "\r\n"
-    client_socket.sendall(response.encode("utf-8"))
-    client_socket.sendall(body)
+
+
+# Complete error responses, built once at startup: {keep_alive: response bytes}
+RESPONSE_400 = prebuild_response(400, "text/plain", b"Bad Request")
+RESPONSE_403 = prebuild_response(403, "text/html", b"<!DOCTYPE html><html><body><h1>403 Forbidden</h1><p>Access denied.</p></body></html>")
+RESPONSE_404 = prebuild_response(404, "text/html", b"<!DOCTYPE html><html><body><h1>404 Not Found</h1><p>File not found.</p></body></html>")
+RESPONSE_404_TYPE = prebuild_response(404, "text/html", b"File type not supported")
+RESPONSE_405 = prebuild_response(405, "text/plain", b"Method Not Allowed")
+RESPONSE_429 = prebuild_response(429, "text/plain", b"Too Many Requests")
+RESPONSE_503 = prebuild_response(503, "text/plain", b"Service Unavailable")
+
+
+def send_prebuilt(client_socket, response):
+    client_socket.sendall(response)
+
+
+def send_response(client_socket, status_code, content_type, body, keep_alive=False):
+    header_bytes = build_headers(status_code, content_type, len(body), keep_alive)
+
+    # Headers and body in one sendmsg() call instead of two sendall() calls
+    try:
+        sent = client_socket.sendmsg([header_bytes, body])
+    except AttributeError:
+        # sendmsg() is not available on every platform
+        client_socket.sendall(header_bytes + body)
+        return
+
+    # Finish a partial write
+    if sent < len(header_bytes):
+        client_socket.sendall(header_bytes[sent:])
+        client_socket.sendall(body)
+    elif sent < len(header_bytes) + len(body):
+        client_socket.sendall(memoryview(body)[sent - len(header_bytes):])
+
+
+def send_file(client_socket, file_path, content_type, st, keep_alive=False):
+    # Small files come from the file cache in one sendmsg()
+    content = read_cached(file_path, st)
+    if content is not None:
+        send_response(client_socket, 200, content_type, content, keep_alive)
+        return
+
+    # Headers from Python, body copied by the kernel via sendfile()
+    with open(file_path, "rb") as f:
+        # The file may have changed since the stat(), so take the length from the open
+        # file and send exactly that much, or a keep-alive client would lose framing
+        content_length = os.fstat(f.fileno()).st_size
+        send_headers(client_socket, 200, content_type, content_length, keep_alive)
+        # socket.sendfile() falls back to read()/send() by itself if sendfile(2) is unusable
+        client_socket.sendfile(f, count=content_length)
+
+
+def configure_client_socket(client_socket):
+    # No Nagle delay for small responses, larger send buffer for big files
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER_SIZE)
 
 
 def run_single_threaded(base_dir):
@@ -266,50 +577,517 @@ def run_single_threaded(base_dir):
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_socket.bind((host, port))
-    server_socket.listen(5)
+    server_socket.listen(LISTEN_BACKLOG)
     print(f"Single-threaded HTTP Server running on http://{host}:{port}")
-    print(f"Serving files from: {os.path.abspath(base_dir)}")
+    print(f"Serving files from: {base_dir}")
 
     try:
         while True:
             client_socket, client_address = server_socket.accept()
-            handle_client(client_socket, client_address, base_dir)
+            configure_client_socket(client_socket)
+            # One connection at a time here, so an idle keep-alive client would block everyone else
+            handle_client(client_socket, client_address, base_dir, keep_alive=False)
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
         server_socket.close()
 
 
+class WorkerPool:
+    # Fixed set of worker threads, all started up front and fed through a
+    # queue, so no thread is created while connections are being served.
+
+    def __init__(self, size, name="http-worker"):
+        self._tasks = queue.SimpleQueue()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}_{i}", daemon=True) for i in range(size)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            fn, args = task
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[{threading.current_thread().name}] Error: {e}")
+
+    def submit(self, fn, *args):
+        self._tasks.put((fn, args))
+
+    def shutdown(self):
+        # Workers finish the tasks already queued, then exit. They are daemon
+        # threads, so one still blocked on a client does not hold up exiting.
+        for _ in self._threads:
+            self._tasks.put(None)
+
+
+class Connection:
+    # A client connection in the multithreaded modes: bytes received past the
+    # last request, and when it last finished a request (for the idle timeout)
+
+    def __init__(self, client_socket, client_address):
+        self.socket = client_socket
+        self.address = client_address
+        self.buffer = bytearray()
+        self.last_active = time.monotonic()
+
+
+def serve_connection(conn, base_dir):
+    # Worker side of the multithreaded modes: serve the requests that are ready
+    # on conn. Returns True to hand the idle connection back to the selector,
+    # False once it has been closed.
+    thread_name = threading.current_thread().name
+    recv_buf = buffer_pool.get()
+    try:
+        recv_view = memoryview(recv_buf)
+        while True:
+            try:
+                request = read_request(conn.socket, recv_view, conn.buffer)
+            except socket.timeout:
+                break
+            if request is None:
+                break
+
+            lines, headers = request
+            if not handle_request(conn.socket, conn.address, base_dir, lines, headers, True):
+                break
+
+            # A pipelined request already sits in conn.buffer, where the selector
+            # cannot see it, so only go back to waiting once the buffer is empty
+            if not conn.buffer:
+                return True
+
+    except Exception as e:
+        print(f"[{thread_name}] Error: {e}")
+        try:
+            send_response(conn.socket, 500, "text/plain", f"Internal Server Error: {e}".encode("utf-8"))
+        except:
+            pass
+    finally:
+        buffer_pool.put(recv_buf)
+
+    conn.socket.close()
+    print(f"[{thread_name}] {conn.address} connection closed")
+    return False
+
+
+def run_selector_loop(server_socket, workers, base_dir, max_open, stop):
+    # One acceptor thread of the multithreaded modes. It waits on its listening
+    # socket and its idle keep-alive connections with one selector (epoll on
+    # Linux). Connections with a request ready go to the shared worker pool, so
+    # idle clients don't tie up a worker thread.
+    thread_name = threading.current_thread().name
+    selector = selectors.DefaultSelector()
+    selector.register(server_socket, selectors.EVENT_READ)
+
+    # Workers report finished connections through this queue and wake the
+    # selector with a byte on the socket pair
+    finished = queue.SimpleQueue()  # (conn, keep_open)
+    wake_reader, wake_writer = socket.socketpair()
+    wake_reader.setblocking(False)
+    wake_writer.setblocking(False)
+    selector.register(wake_reader, selectors.EVENT_READ)
+
+    def work(conn):
+        keep_open = serve_connection(conn, base_dir)
+        finished.put((conn, keep_open))
+        try:
+            wake_writer.send(b"\0")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+        except OSError:
+            # The acceptor has shut down and will not take the connection back
+            if keep_open:
+                conn.socket.close()
+
+    # Connections this acceptor has admitted and not closed yet, whether idle in
+    # the selector or handed to the workers. Every one of them may queue a task
+    # at any moment, so this is what keeps the work queue bounded.
+    open_connections = 0
+    last_sweep = time.monotonic()
+
+    try:
+        while not stop.is_set():
+            for key, _ in selector.select(timeout=1):
+                if key.fileobj is server_socket:
+                    client_socket, client_address = server_socket.accept()
+                    configure_client_socket(client_socket)
+
+                    # Shed load instead of letting the work queue grow without bound
+                    if open_connections >= max_open:
+                        try:
+                            send_prebuilt(client_socket, RESPONSE_503[False])
+                        except OSError:
+                            pass
+                        client_socket.close()
+                        continue
+
+                    print(f"[{thread_name}] {client_address} connected")
+                    open_connections += 1
+                    client_socket.settimeout(KEEP_ALIVE_TIMEOUT)
+                    selector.register(client_socket, selectors.EVENT_READ, Connection(client_socket, client_address))
+
+                elif key.fileobj is wake_reader:
+                    try:
+                        while wake_reader.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+
+                else:
+                    # A request is arriving: the worker owns the socket until it is done
+                    selector.unregister(key.fileobj)
+                    workers.submit(work, key.data)
+
+            now = time.monotonic()
+            while True:
+                try:
+                    conn, keep_open = finished.get_nowait()
+                except queue.Empty:
+                    break
+                if keep_open:
+                    conn.last_active = now
+                    selector.register(conn.socket, selectors.EVENT_READ, conn)
+                else:
+                    open_connections -= 1
+
+            # Close connections that stayed idle for KEEP_ALIVE_TIMEOUT seconds
+            if now - last_sweep >= 1:
+                last_sweep = now
+                for key in list(selector.get_map().values()):
+                    conn = key.data
+                    if conn is not None and now - conn.last_active >= KEEP_ALIVE_TIMEOUT:
+                        selector.unregister(conn.socket)
+                        conn.socket.close()
+                        open_connections -= 1
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+        wake_writer.close()
+        # Connections handed back before wake_writer was closed; workers that
+        # finish later see it closed and close their connection themselves
+        while True:
+            try:
+                conn, keep_open = finished.get_nowait()
+            except queue.Empty:
+                break
+            if keep_open:
+                conn.socket.close()
+
+
 def run_multithreaded(base_dir):
     host, port = "0.0.0.0", 8000
+
+    # With SO_REUSEPORT every acceptor thread gets its own listening socket and
+    # the kernel spreads new connections across them
+    acceptors = ACCEPT_THREADS if hasattr(socket, "SO_REUSEPORT") else 1
+
+    # SO_REUSEPORT would also let this server join the sockets of one already
+    # running on the port (started by the same user) and silently take part of
+    # its traffic. A plain bind fails in that case, so try one first. A server
+    # started later with SO_REUSEPORT can still join ours.
+    if acceptors > 1:
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            probe.bind((host, port))
+        finally:
+            probe.close()
+
+    server_sockets = []
+    for _ in range(acceptors):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if acceptors > 1:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server_socket.bind((host, port))
+        server_socket.listen(LISTEN_BACKLOG)
+        server_sockets.append(server_socket)
+    print(f"Multithreaded HTTP Server running on http://{host}:{port} ({acceptors} acceptor threads)")
+    print(f"Serving files from: {base_dir}")
+
+    # Bounded pool of prestarted worker threads shared by all acceptors; each
+    # acceptor keeps open at most its share of the connections the pool may hold
+    workers = WorkerPool(MAX_WORKERS)
+    max_open = (MAX_WORKERS + MAX_QUEUED_CONNECTIONS) // acceptors
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=run_selector_loop,
+            args=(server_socket, workers, base_dir, max_open, stop),
+            name=f"acceptor-{i}",
+        )
+        for i, server_socket in enumerate(server_sockets)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        # The acceptors notice within one select() timeout and close their sockets
+        stop.set()
+        for thread in threads:
+            thread.join()
+        workers.shutdown()
+
+
+def prepare_response(lines, headers, base_dir, keep_alive=False):
+    # Route one request for the event-loop modes (uring, async). Returns
+    # (header_bytes, body, file_path, keep_alive): generated pages and cached
+    # small files come back as body, larger files as file_path so the caller
+    # can choose how to send them. For those header_bytes is None; the caller
+    # builds them with file_headers() once the file is open.
+    request_line = lines[0].split()
+    if len(request_line) < 2:
+        return RESPONSE_400[False], b"", None, False
+
+    keep_alive = keep_alive and wants_keep_alive(request_line, headers)
+    method, url_path = request_line[0], unquote(request_line[1])
+    if method != "GET":
+        return RESPONSE_405[keep_alive], b"", None, keep_alive
+
+    file_path = os.path.normpath(os.path.join(base_dir, url_path.lstrip("/")))
+    if not is_inside(base_dir, file_path):
+        return RESPONSE_403[keep_alive], b"", None, keep_alive
+
+    try:
+        st = os.stat(file_path)
+    except (OSError, ValueError):  # ValueError: embedded NUL byte in the path
+        return RESPONSE_404[keep_alive], b"", None, keep_alive
+
+    # Only one thread runs the asyncio loop, so a plain increment is safe here
+    if SERVER_MODE == "async":
+        file_hits[file_path] += 1
+
+    if stat.S_ISDIR(st.st_mode):
+        body = generate_directory_listing(file_path, url_path)
+        return build_headers(200, "text/html", len(body), keep_alive), body, None, keep_alive
+
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        return RESPONSE_404_TYPE[keep_alive], b"", None, keep_alive
+
+    content = read_cached(file_path, st)
+    if content is not None:
+        return build_headers(200, CONTENT_TYPES[ext], len(content), keep_alive), content, None, keep_alive
+    return None, b"", file_path, keep_alive
+
+
+def file_headers(f, file_path, keep_alive):
+    # Headers for a file_path from prepare_response(), opened as f. The file may
+    # have changed since the stat(), so the length comes from the open file and
+    # the caller must send exactly that much. Returns (header_bytes, content_length).
+    content_length = os.fstat(f.fileno()).st_size
+    content_type = CONTENT_TYPES[os.path.splitext(file_path)[1].lower()]
+    return build_headers(200, content_type, content_length, keep_alive), content_length
+
+
+def internal_error_response(error):
+    # Complete 500 response for the event-loop modes, which cannot use send_response()
+    body = f"Internal Server Error: {error}".encode("utf-8")
+    return build_headers(500, "text/plain", len(body)) + body
+
+
+def build_response(request_data, base_dir):
+    # Build the complete response for one request (uring mode, no counters)
+    lines, headers = parse_request_head(request_data[:request_data.find(b"\r\n\r\n")])
+    header_bytes, body, file_path, _ = prepare_response(lines, headers, base_dir)
+    if file_path is not None:
+        with open(file_path, "rb") as f:
+            header_bytes, content_length = file_headers(f, file_path, False)
+            body = f.read(content_length)
+    return header_bytes + body
+
+
+def run_io_uring(base_dir):
+    if liburing is None:
+        print("Error: uring mode needs the liburing package (pip install liburing)")
+        sys.exit(1)
+
+    host, port = "0.0.0.0", 8000
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_socket.bind((host, port))
-    server_socket.listen(5)
-    print(f"Multithreaded HTTP Server running on http://{host}:{port}")
-    print(f"Serving files from: {os.path.abspath(base_dir)}")
+    server_socket.listen(LISTEN_BACKLOG)
+    print(f"io_uring HTTP Server running on http://{host}:{port}")
+    print(f"Serving files from: {base_dir}")
+
+    ring = liburing.Ring()
+    liburing.io_uring_queue_init(URING_ENTRIES, ring)
+    cqe = liburing.Cqe()
+
+    pending = {}  # {user_data: (op, fd, buffer)} for operations in flight
+    requests = {}  # {fd: bytearray} request bytes received so far
+    next_id = 0
+
+    def submit(op, fd, buffer=None):
+        # Queue an operation; all queued operations go to the kernel in one batch
+        nonlocal next_id
+        sqe = liburing.io_uring_get_sqe(ring)
+        if sqe is None:
+            liburing.io_uring_submit(ring)
+            sqe = liburing.io_uring_get_sqe(ring)
+
+        if op == "accept":
+            liburing.io_uring_prep_accept(sqe, fd)
+        elif op == "recv":
+            liburing.io_uring_prep_recv(sqe, fd, buffer)
+        elif op == "send":
+            liburing.io_uring_prep_send(sqe, fd, buffer)
+        else:
+            liburing.io_uring_prep_close(sqe, fd)
+
+        next_id += 1
+        sqe.user_data = next_id
+        pending[next_id] = (op, fd, buffer)
 
     try:
+        submit("accept", server_socket.fileno())
         while True:
-            client_socket, client_address = server_socket.accept()
-            client_thread = threading.Thread(
-                target=handle_client,
-                args=(client_socket, client_address, base_dir),
-                daemon=True,
-            )
-            client_thread.start()
+            liburing.io_uring_submit(ring)
+            liburing.io_uring_wait_cqe(ring, cqe)
+            ready = liburing.io_uring_cq_ready(ring)
+            completions = [(cqe[i].user_data, cqe[i].res) for i in range(ready)]
+            liburing.io_uring_cq_advance(ring, ready)
+
+            for user_data, res in completions:
+                op, fd, buffer = pending.pop(user_data)
+
+                if op == "accept":
+                    submit("accept", fd)
+                    if res >= 0:
+                        requests[res] = bytearray()
+                        submit("recv", res, buffer_pool.get())
+
+                elif op == "recv":
+                    if res <= 0:
+                        buffer_pool.put(buffer)
+                        del requests[fd]
+                        submit("close", fd)
+                        continue
+                    request_data = requests[fd]
+                    request_data += buffer[:res]
+                    header_end = request_data.find(b"\r\n\r\n")
+                    if header_end > MAX_HEADER_SIZE or (header_end == -1 and len(request_data) > MAX_HEADER_SIZE):
+                        buffer_pool.put(buffer)
+                        del requests[fd]
+                        submit("send", fd, RESPONSE_400[False])
+                    elif header_end != -1:
+                        buffer_pool.put(buffer)
+                        del requests[fd]
+                        try:
+                            response = build_response(request_data, base_dir)
+                        except Exception as e:
+                            # One bad request must not take the whole loop down
+                            print(f"[uring] Error: {e}")
+                            response = internal_error_response(e)
+                        submit("send", fd, response)
+                    else:
+                        submit("recv", fd, buffer)
+
+                elif op == "send":
+                    # Send the rest after a partial write, otherwise close. A
+                    # memoryview slice avoids copying the unsent tail each time.
+                    if 0 < res < len(buffer):
+                        submit("send", fd, memoryview(buffer)[res:])
+                    else:
+                        submit("close", fd)
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
+        liburing.io_uring_queue_exit(ring)
         server_socket.close()
 
 
+async def handle_async_client(reader, writer, base_dir):
+    loop = asyncio.get_running_loop()
+    print(f"[async] {writer.get_extra_info('peername')} connected")
+
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                break
+            except asyncio.LimitOverrunError:
+                # Request headers larger than MAX_HEADER_SIZE
+                writer.write(RESPONSE_400[False])
+                await writer.drain()
+                break
+
+            lines, headers = parse_request_head(head[:-4])
+            body_length = parse_content_length(headers)
+            if body_length is None:
+                writer.write(RESPONSE_400[False])
+                await writer.drain()
+                break
+            while body_length:
+                chunk = await reader.read(min(body_length, RECV_CHUNK))
+                if not chunk:
+                    return
+                body_length -= len(chunk)
+
+            header_bytes, body, file_path, keep_alive = prepare_response(lines, headers, base_dir, keep_alive=True)
+            if file_path is None:
+                writer.write(header_bytes + body)
+            else:
+                with open(file_path, "rb") as f:
+                    header_bytes, content_length = file_headers(f, file_path, keep_alive)
+                    writer.write(header_bytes)
+                    # loop.sendfile() flushes the headers first, then uses os.sendfile()
+                    await loop.sendfile(writer.transport, f, count=content_length)
+            await writer.drain()
+
+            if not keep_alive:
+                break
+    except Exception as e:
+        print(f"[async] Error: {e}")
+        try:
+            writer.write(internal_error_response(e))
+            await writer.drain()
+        except OSError:
+            pass
+    finally:
+        writer.close()
+        print("[async] Connection closed")
+
+
+async def serve_async(base_dir):
+    host, port = "0.0.0.0", 8000
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_async_client(reader, writer, base_dir),
+        host, port, backlog=LISTEN_BACKLOG, limit=MAX_HEADER_SIZE,
+    )
+    print(f"asyncio HTTP Server running on http://{host}:{port}")
+    print(f"Serving files from: {base_dir}")
+    async with server:
+        await server.serve_forever()
+
+
+def run_async(base_dir):
+    try:
+        asyncio.run(serve_async(base_dir))
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: python server.py <directory>")
         sys.exit(1)
 
-    base_dir = sys.argv[1]
+    # Resolve once here so requests don't have to
+    base_dir = os.path.abspath(sys.argv[1])
 
     if not os.path.isdir(base_dir):
         print(f"Error: {base_dir} is not a valid directory")
@@ -317,6 +1095,10 @@ def main():
 
     if SERVER_MODE == "single":
         run_single_threaded(base_dir)
+    elif SERVER_MODE == "uring":
+        run_io_uring(base_dir)
+    elif SERVER_MODE == "async":
+        run_async(base_dir)
     else:
         run_multithreaded(base_dir)
 
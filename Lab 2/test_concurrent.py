@@ -5,36 +5,49 @@ Tests the performance difference between single-threaded and multithreaded serve
 """
 import socket
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# Only the response headers are read, and they must fit in RESPONSE_BUFFER_SIZE
+# bytes. RECV_BUFFER_SIZE is the SO_RCVBUF requested for every test connection.
+RESPONSE_BUFFER_SIZE = 65536
+RECV_BUFFER_SIZE = 262144
 
-def make_request(host, port, path, request_num, results):
-    """Make a single HTTP GET request and record timing."""
+
+def make_request(host, port, request, request_num):
+    """Send the encoded HTTP GET request and return its timing."""
     start_time = time.time()
 
     try:
         # Create socket
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.settimeout(15)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         # Connect
         client_socket.connect((host, port))
 
         # Send HTTP GET request
-        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n"
-        client_socket.sendall(request.encode('utf-8'))
-
-        # Receive response (at least the headers)
-        response = b''
-        while True:
-            chunk = client_socket.recv(4096)
-            if not chunk:
+        client_socket.sendall(request)
+
+        # Receive response (at least the headers) into a preallocated buffer
+        buf = bytearray(RESPONSE_BUFFER_SIZE)
+        view = memoryview(buf)
+        received = 0
+        while received < len(buf):
+            n = client_socket.recv_into(view[received:])
+            if not n:
                 break
-            response += chunk
+            # Only the new bytes, plus 3 before them, can complete the header terminator
+            scan_from = max(0, received - 3)
+            received += n
             # For testing, we just need to receive the response
-            if b'\r\n\r\n' in response:
+            if buf.find(b'\r\n\r\n', scan_from, received) != -1:
                 break
+        else:
+            raise ValueError('Response headers do not fit in the receive buffer')
+        response = bytes(view[:received])
 
         client_socket.close()
 
@@ -45,7 +58,7 @@ def make_request(host, port, path, request_num, results):
         status_line = response.split(b'\r\n')[0].decode('utf-8', errors='ignore')
         status_code = status_line.split()[1] if len(status_line.split()) > 1 else 'Unknown'
 
-        results[request_num] = {
+        result = {
             'success': True,
             'status': status_code,
             'time': elapsed,
@@ -54,12 +67,13 @@ def make_request(host, port, path, request_num, results):
         }
 
         print(f"Request #{request_num}: Status {status_code}, Time: {elapsed:.2f}s")
+        return result
 
     except Exception as e:
         end_time = time.time()
         elapsed = end_time - start_time
 
-        results[request_num] = {
+        result = {
             'success': False,
             'error': str(e),
             'time': elapsed,
@@ -68,6 +82,7 @@ def make_request(host, port, path, request_num, results):
         }
 
         print(f"Request #{request_num}: FAILED - {e}")
+        return result
 
 
 def test_server(host, port, path, num_requests, server_type):
@@ -77,24 +92,17 @@ def test_server(host, port, path, num_requests, server_type):
     print(f"{'=' * 60}")
     print(f"Making {num_requests} concurrent requests to http://{host}:{port}{path}")
 
-    results = {}
-    threads = []
+    # Every thread sends the same request, so format and encode it once
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('utf-8')
 
     # Record overall start time
     overall_start = time.time()
 
-    # Create and start all threads
-    for i in range(num_requests):
-        thread = threading.Thread(
-            target=make_request,
-            args=(host, port, path, i + 1, results)
-        )
-        threads.append(thread)
-        thread.start()
-
-    # Wait for all threads to complete
-    for thread in threads:
-        thread.join()
+    # One pool thread per request so they all run at once; results come back from the futures
+    with ThreadPoolExecutor(max_workers=num_requests) as executor:
+        futures = {i + 1: executor.submit(make_request, host, port, request, i + 1)
+                   for i in range(num_requests)}
+        results = {num: future.result() for num, future in futures.items()}
 
     # Record overall end time
     overall_end = time.time()
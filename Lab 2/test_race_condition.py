@@ -3,43 +3,126 @@
 Race Condition Testing Script
 Tests whether the server's counter has race conditions.
 """
+import functools
 import socket
 import threading
 import time
-import re
 from datetime import datetime
 
+# read_responses() parses the pipelined responses in a RESPONSE_BUFFER_SIZE
+# buffer. Each connection asks for a RECV_BUFFER_SIZE kernel receive buffer,
+# as all of its responses arrive back-to-back.
+RESPONSE_BUFFER_SIZE = 65536
+RECV_BUFFER_SIZE = 262144
 
-def make_request(host, port, path, request_num, results):
-    """Make a single HTTP GET request."""
-    try:
-        # Create socket
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.settimeout(5)
+# The directory listing buffer grows as needed, but never beyond this
+MAX_LISTING_SIZE = 16 << 20
 
-        # Connect
-        client_socket.connect((host, port))
+# Seconds a connected thread waits at the barrier for the others
+BARRIER_TIMEOUT = 10
 
-        # Send HTTP GET request
-        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n"
-        client_socket.sendall(request.encode('utf-8'))
 
-        # Receive response
-        response = b''
+def get_content_length(head):
+    """Return the Content-Length of a response head, or 0 if it has none."""
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            return int(value)
+    return 0
+
+
+def read_responses(client_socket, count):
+    """Read up to count pipelined responses, skipping their bodies.
+
+    Returns how many complete responses arrived before the server closed the connection.
+    """
+    buf = bytearray(RESPONSE_BUFFER_SIZE)
+    view = memoryview(buf)
+    received = 0  # bytes of the current response kept at the start of buf
+
+    for done in range(count):
+        # Receive until the end of the response headers, scanning each byte only once
+        scan_from = 0
         while True:
-            chunk = client_socket.recv(4096)
-            if not chunk:
-                break
-            response += chunk
-            if b'\r\n\r\n' in response:
+            header_end = buf.find(b'\r\n\r\n', scan_from, received)
+            if header_end != -1:
                 break
+            if received == len(buf):
+                raise ValueError('Response headers too large')
+            scan_from = max(0, received - 3)
+            n = client_socket.recv_into(view[received:])
+            if not n:
+                return done
+            received += n
+
+        # Skip the body. Bytes past it already belong to the next response.
+        body_left = get_content_length(buf[:header_end])
+        extra = received - (header_end + 4)
+        if extra > body_left:
+            leftover = extra - body_left
+            buf[:leftover] = buf[received - leftover:received]
+            received = leftover
+            body_left = 0
+        else:
+            body_left -= extra
+            received = 0
 
-        client_socket.close()
+        while body_left:
+            n = client_socket.recv_into(view[:min(body_left, len(buf))])
+            if not n:
+                return done
+            body_left -= n
+
+    return count
 
-        results[request_num] = {'success': True}
+
+def make_request(host, port, request, request_num, count, results, barrier):
+    """Send the encoded HTTP GET request count times, pipelined over one keep-alive connection.
+
+    The first connection waits at barrier, so that all threads send their requests together.
+    """
+    completed = 0
+    try:
+        # A server without keep-alive closes after one response, so reconnect
+        # and resend whatever is left
+        while completed < count:
+            # Create the socket and connect, then wait for the other threads
+            # (even if this failed, so they are not left waiting)
+            try:
+                client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                client_socket.settimeout(5)
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client_socket.connect((host, port))
+            finally:
+                if barrier is not None:
+                    try:
+                        barrier.wait()
+                    except threading.BrokenBarrierError:
+                        pass  # some thread never arrived, send without it
+                    barrier = None
+
+            # Send all remaining requests back-to-back, then read the responses
+            client_socket.sendall(request * (count - completed))
+            done = read_responses(client_socket, count - completed)
+
+            client_socket.close()
+
+            if not done:
+                raise ConnectionError('Connection closed without a response')
+            completed += done
+
+        results[request_num] = {'success': True, 'completed': completed}
 
     except Exception as e:
-        results[request_num] = {'success': False, 'error': str(e)}
+        results[request_num] = {'success': False, 'completed': completed, 'error': str(e)}
+
+
+@functools.lru_cache(maxsize=64)
+def counter_anchor(target_file):
+    """Return the encoded listing text that directly precedes target_file's hit count."""
+    # Row: <td><a href="/filename">filename</a></td><td>123</td>
+    return f'<a href="/{target_file}">{target_file}</a></td><td>'.encode('utf-8')
 
 
 def get_counter_value(host, port, base_dir_path, target_file):
@@ -48,61 +131,76 @@ def get_counter_value(host, port, base_dir_path, target_file):
         # Create socket
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.settimeout(5)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         # Connect
         client_socket.connect((host, port))
 
         # Request directory listing
-        request = f"GET / HTTP/1.1\r\nHost: {host}\r\n\r\n"
+        # Ask the server to close the connection so we can read until EOF
+        request = f"GET / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n"
         client_socket.sendall(request.encode('utf-8'))
 
-        # Receive full response
-        response = b''
+        # Receive full response, growing the buffer instead of concatenating chunks
+        buf = bytearray(RESPONSE_BUFFER_SIZE)
+        received = 0
         while True:
-            chunk = client_socket.recv(4096)
-            if not chunk:
+            if received == len(buf):
+                if received >= MAX_LISTING_SIZE:
+                    raise ValueError('Directory listing too large')
+                buf.extend(bytes(len(buf)))
+            n = client_socket.recv_into(memoryview(buf)[received:])
+            if not n:
                 break
-            response += chunk
+            received += n
 
         client_socket.close()
 
-        # Parse HTML to find counter value
-        html = response.decode('utf-8', errors='ignore')
-
-        # Look for the target file and its hit count
-        # Pattern: <td><a href="/filename">filename</a></td><td>123</td>
-        pattern = rf'<a href="/{re.escape(target_file)}">{re.escape(target_file)}</a></td><td>(\d+)</td>'
-        match = re.search(pattern, html)
-
-        if match:
-            return int(match.group(1))
-        else:
+        # Look for the target file and its hit count in the raw bytes,
+        # only the number itself gets converted
+        anchor = counter_anchor(target_file)
+        start = buf.find(anchor, 0, received)
+        if start == -1:
             print(f"Warning: Could not find counter for {target_file} in HTML")
             return None
 
+        start += len(anchor)
+        end = buf.find(b'<', start, received)
+        return int(buf[start:end])
+
     except Exception as e:
         print(f"Error fetching counter: {e}")
         return None
 
 
-def test_race_condition(host, port, target_file, num_requests):
+def test_race_condition(host, port, target_file, num_requests, num_connections):
     """Test for race conditions by making concurrent requests."""
 
     print(f"Target: http://{host}:{port}/{target_file}")
     print(f"Number of requests: {num_requests}")
 
-    results = {}
+    # One slot per connection thread, each thread only writes its own index
+    results = [None] * num_connections
     threads = []
 
+    # Every request is the same, so format and encode it once
+    request = f"GET /{target_file} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode('utf-8')
+
     # Record start time
     start_time = time.time()
 
-    # Create and start all threads
-    print(f"Sending {num_requests} concurrent requests to /{target_file}...")
-    for i in range(num_requests):
+    # Create and start one thread per connection, each pipelining its share of the requests.
+    # They all connect first and are released together by the barrier, so thread start-up
+    # time does not spread the requests out.
+    print(f"Sending {num_requests} concurrent requests to /{target_file} "
+          f"over {num_connections} keep-alive connections...")
+    barrier = threading.Barrier(num_connections, timeout=BARRIER_TIMEOUT)
+    for i in range(num_connections):
+        count = num_requests // num_connections + (i < num_requests % num_connections)
         thread = threading.Thread(
             target=make_request,
-            args=(host, port, f'/{target_file}', i + 1, results)
+            args=(host, port, request, i, count, results, barrier)
         )
         threads.append(thread)
         thread.start()
@@ -115,7 +213,7 @@ def test_race_condition(host, port, target_file, num_requests):
     elapsed = end_time - start_time
 
     # Check results
-    successful = sum(1 for r in results.values() if r.get('success', False))
+    successful = sum(r['completed'] for r in results if r)
     failed = num_requests - successful
 
     print(f"Done! ({elapsed:.2f}s)")
@@ -123,10 +221,16 @@ def test_race_condition(host, port, target_file, num_requests):
     if failed > 0:
         print(f"Failed requests: {failed}")
 
-    # Now fetch the counter value
-    time.sleep(0.5)  # Brief pause to let server finish processing
-
+    # Now fetch the counter value, polling until two readings agree
+    # (the server has finished processing) or 2 seconds have passed
+    deadline = time.monotonic() + 2
     counter_value = get_counter_value(host, port, '.', target_file)
+    while counter_value is not None and time.monotonic() < deadline:
+        time.sleep(0.02)
+        current = get_counter_value(host, port, '.', target_file)
+        if current is None or current == counter_value:
+            break
+        counter_value = current
 
     print(f"\n{'=' * 60}")
     print(f"Results")
@@ -145,12 +249,13 @@ def main():
     port = 8000
     target_file = 'Task2.pdf'
     num_requests = 100  # Number of concurrent requests
+    num_connections = 20  # Requests are pipelined over this many connections
 
     print("Race Condition Testing Tool")
     print("=" * 60)
 
     # Run the test
-    counter = test_race_condition(host, port, target_file, num_requests)
+    counter = test_race_condition(host, port, target_file, num_requests, num_connections)
 
 if __name__ == '__main__':
     main()
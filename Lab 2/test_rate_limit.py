@@ -3,34 +3,30 @@
 Rate Limiting Test Script
 Tests that the server enforces ~5 requests/second per IP.
 """
+import asyncio
 import socket
 import time
-import threading
 
+# Response headers must fit in RESPONSE_BUFFER_SIZE bytes, and the same buffer
+# is reused to drain the bodies. The slow-requests test's keep-alive connection
+# asks for a RECV_BUFFER_SIZE kernel receive buffer.
+RESPONSE_BUFFER_SIZE = 65536
+RECV_BUFFER_SIZE = 262144
 
-def make_request(host, port, path, request_num, delay=0):
-    """Make a single HTTP GET request with optional delay."""
+
+async def make_request(host, port, request, request_num, delay=0):
+    """Send the encoded HTTP GET request with optional delay."""
     if delay > 0:
-        time.sleep(delay)
+        await asyncio.sleep(delay)
 
+    writer = None
     try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.settimeout(3)
-        client_socket.connect((host, port))
-
-        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n"
-        client_socket.sendall(request.encode('utf-8'))
-
-        response = b''
-        while True:
-            chunk = client_socket.recv(4096)
-            if not chunk:
-                break
-            response += chunk
-            if b'\r\n\r\n' in response:
-                break
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), 3)
 
-        client_socket.close()
+        writer.write(request)
+        await writer.drain()
+
+        response = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 3)
 
         # Parse status code
         status_line = response.split(b'\r\n')[0].decode('utf-8', errors='ignore')
@@ -41,6 +37,52 @@ def make_request(host, port, path, request_num, delay=0):
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def send_keep_alive_request(client_socket, request):
+    """Send the encoded GET request over an open connection and read the whole response.
+
+    Returns the status code and whether the server keeps the connection open.
+    """
+    client_socket.sendall(request)
+
+    buf = bytearray(RESPONSE_BUFFER_SIZE)
+    view = memoryview(buf)
+    received = 0
+    scan_from = 0  # earlier bytes were already searched for the header terminator
+    while True:
+        header_end = buf.find(b'\r\n\r\n', scan_from, received)
+        if header_end != -1:
+            break
+        if received == len(buf):
+            raise ValueError('Response headers too large')
+        scan_from = max(0, received - 3)
+        n = client_socket.recv_into(view[received:])
+        if not n:
+            raise ConnectionError('Connection closed by server')
+        received += n
+
+    lines = buf[:header_end].decode('utf-8', errors='ignore').split('\r\n')
+    status_code = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+
+    # Read the rest of the body so the next response starts cleanly
+    body_left = int(headers.get('content-length', 0)) - (received - header_end - 4)
+    while body_left > 0:
+        n = client_socket.recv_into(view[:min(body_left, len(buf))])
+        if not n:
+            raise ConnectionError('Connection closed by server')
+        body_left -= n
+
+    return status_code, headers.get('connection', '').lower() != 'close'
+
 
 def test_rapid_requests(host, port, path, num_requests):
     """Test with rapid concurrent requests (should hit rate limit)."""
@@ -49,27 +91,19 @@ def test_rapid_requests(host, port, path, num_requests):
     print(f"{'=' * 60}")
     print(f"Sending {num_requests} requests as fast as possible...")
 
-    start_time = time.time()
-    results = []
-    threads = []
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('utf-8')
 
-    # Send all requests at once
-    for i in range(num_requests):
-        result_container = [None]
-        thread = threading.Thread(
-            target=lambda r=result_container, n=i: r.__setitem__(0, make_request(host, port, path, n))
-        )
-        results.append(result_container)
-        threads.append(thread)
-        thread.start()
+    async def send_all():
+        return await asyncio.gather(*(make_request(host, port, request, i) for i in range(num_requests)))
 
-    for thread in threads:
-        thread.join()
+    start_time = time.time()
+
+    # Send all requests at once, as coroutines on one event loop instead of one thread each
+    results = asyncio.run(send_all())
 
     elapsed = time.time() - start_time
 
     # Analyze results
-    results = [r[0] for r in results if r[0] is not None]
     status_200 = sum(1 for r in results if r.get('status') == 200)
     status_429 = sum(1 for r in results if r.get('status') == 429)
     failed = sum(1 for r in results if not r.get('success', False))
@@ -89,17 +123,41 @@ def test_slow_requests(host, port, path, num_requests, delay_between):
     print(f"{'=' * 60}")
     print(f"Sending {num_requests} requests with {delay_between}s delay...")
 
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode('utf-8')
+
     start_time = time.time()
     results = []
 
+    # Reuse one keep-alive connection, reconnecting only when the server closes it
+    client_socket = None
     for i in range(num_requests):
         if i > 0:
             time.sleep(delay_between)
-        result = make_request(host, port, path, i)
+        try:
+            if client_socket is None:
+                client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                client_socket.settimeout(3)
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                client_socket.connect((host, port))
+
+            status_code, keep_open = send_keep_alive_request(client_socket, request)
+            result = {'success': True, 'status': status_code}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+            keep_open = False
+
+        if not keep_open and client_socket is not None:
+            client_socket.close()
+            client_socket = None
+
         results.append(result)
         status = result.get('status', 'Error')
         print(f"  Request {i + 1}: {status}")
 
+    if client_socket is not None:
+        client_socket.close()
+
     elapsed = time.time() - start_time
 
     # Analyze results